@@ -44,7 +44,7 @@ class object and execute the following commands on gps receiver:
 - **setCom(baud=115200):** changes baudrate to 115200bps
 - **askLog(trigger=2,period=0.1):** ask for log *bestxyz* with trigger `ONTIME`
   and period `0.1`
-- wait for 10 seconds
+- wait for 100 samples (``-c``), or at most 15 seconds
 - **shutdown:** safely disconnects from gps receiver
 
 Example:
@@ -56,19 +56,322 @@ Example:
 
 """
 
-import binascii
-import crcmod
-from datetime import datetime
+from collections import deque, namedtuple
+import concurrent.futures
 import logging
+import operator
 import os
+import queue
 import serial
 import struct
+import sys
 import threading
-from time import sleep
+from time import localtime, monotonic, sleep, strftime, time_ns
 try:
-    import queue
+    import zlib
 except ImportError:
-    import Queue as queue
+    # some embedded Python builds come without zlib
+    zlib = None
+
+
+def _makeCrcTables():
+    # slice-by-8 tables for the reflected 0x04C11DB7 polynomial. Table k
+    # gives the crc of a byte followed by k zero bytes.
+    tables = [[0] * 256 for _ in range(8)]
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xEDB88320 if crc & 1 else crc >> 1
+        tables[0][i] = crc
+    for i in range(256):
+        crc = tables[0][i]
+        for k in range(1, 8):
+            crc = (crc >> 8) ^ tables[0][crc & 0xFF]
+            tables[k][i] = crc
+    return tables
+
+
+def _crc32Table(data):
+    """Pure Python Novatel CRC-32, used when zlib is not available.
+
+    Eight bytes are processed per step with one table lookup per byte.
+    """
+    t0, t1, t2, t3, t4, t5, t6, t7 = _CRC_TABLES
+    data = memoryview(data).cast('B')
+    size = len(data) - len(data) % 8
+    crc = 0
+    for low, high in _U32X2.iter_unpack(data[:size]):
+        low ^= crc
+        crc = (t7[low & 0xFF] ^ t6[(low >> 8) & 0xFF] ^
+               t5[(low >> 16) & 0xFF] ^ t4[low >> 24] ^
+               t3[high & 0xFF] ^ t2[(high >> 8) & 0xFF] ^
+               t1[(high >> 16) & 0xFF] ^ t0[high >> 24])
+    for byte in data[size:]:
+        crc = (crc >> 8) ^ t0[(crc ^ byte) & 0xFF]
+    return crc
+
+
+def _crc32Zlib(data):
+    # Novatel CRC-32 is the reflected 0x04C11DB7 polynomial (the zlib one)
+    # but with a zero initial value and no final xor. Passing 0xFFFFFFFF as
+    # starting value and xoring the result undoes zlib's own inversions.
+    return zlib.crc32(data, 0xFFFFFFFF) ^ 0xFFFFFFFF
+
+
+if zlib is not None:
+    _crc32 = _crc32Zlib
+else:
+    _U32X2 = struct.Struct('<II')
+    _CRC_TABLES = _makeCrcTables()
+    _crc32 = _crc32Table
+
+
+_U16 = struct.Struct('<H')
+_U32LE = struct.Struct('<L')
+_SYNC = b'\xAA\x44\x12'
+
+
+def _checkFrame(view, start, size):
+    """Check the message starting with a sync vector at view[start].
+
+    Args:
+        view: memoryview of the bytes received.
+        start: offset of the sync vector.
+        size: number of bytes received.
+
+    Returns:
+        end offset of the message, crc included, if it is complete and
+        valid. 0 if it is not a valid message, None if more bytes are
+        needed to tell.
+    """
+    if start + 3 >= size:
+        return None
+    # header length is fixed, anything else is a false sync vector
+    if view[start + 3] != 28:
+        return 0
+    if start + 28 > size:
+        return None
+    # 28 bytes header, messageLength at offset 8, crc after the body
+    end = start + 32 + _U16.unpack_from(view, start + 8)[0]
+    if end > size:
+        return None
+    if _crc32(view[start:end - 4]) != _U32LE.unpack_from(view, end - 4)[0]:
+        return 0
+    return end
+
+
+def _splitFrames(rxBuffer):
+    """Find the complete messages in a buffer of received bytes.
+
+    Bytes before a sync vector are skipped. A sync vector is only taken as
+    the start of a message if its header length is 28 and its crc matches,
+    otherwise search goes on from the next byte. A trailing incomplete
+    message, or a trailing partial sync vector, is left for the next call.
+
+    Args:
+        rxBuffer: bytes received from the receiver.
+
+    Returns:
+        A list of (start, end) offsets of each complete message, crc
+        included, and the number of bytes at the start of rxBuffer which can
+        be discarded.
+    """
+    frames = []
+    size = len(rxBuffer)
+    pos = 0
+    find = rxBuffer.find
+    with memoryview(rxBuffer) as view:
+        while True:
+            start = find(_SYNC, pos)
+            if start < 0:
+                # keep a possible partial sync vector at the end
+                if size - pos >= 2 and rxBuffer.endswith(b'\xAA\x44'):
+                    return frames, size - 2
+                if size > pos and rxBuffer[-1] == 0xAA:
+                    return frames, size - 1
+                return frames, size
+            end = _checkFrame(view, start, size)
+            if end is None:
+                # a corrupted header may announce a length past the
+                # messages that follow it. If a valid message starts
+                # after this sync vector, this one is not waited for.
+                following = find(_SYNC, start + 1)
+                if following < 0 or not _checkFrame(view, following, size):
+                    return frames, start
+                end = 0
+            if end == 0:
+                pos = start + 1
+                continue
+            frames.append((start, end))
+            pos = end
+
+
+# '0x00' to '0xFF', indexed by byte value. Used by Gps.getDebugMessage
+_HEX_BYTES = tuple('0x{0:02X}'.format(i) for i in range(256))
+
+
+#: Header of a received message, as kept in :attr:`Gps.current_header`.
+Header = namedtuple('Header', ('sync', 'headerLength', 'messageID',
+                               'messageType', 'portAddress', 'messageLength',
+                               'sequence', 'idleTime', 'timeStatus', 'week',
+                               'ms', 'receiverStatus', 'reserved',
+                               'swVersion'))
+
+#: A BESTXYZ solution as put on the dataQueue by :meth:`Gps.parseResponces`.
+#: Besides the log fields it carries a running ``Index`` and the reception
+#: ``Time``, as integer nanoseconds since the epoch.
+BestXYZ = namedtuple('BestXYZ', ('Index', 'Time', 'pSolStatus', 'posType',
+                                 'position', 'positionStd', 'velSolStatus',
+                                 'velType', 'velocity', 'velocityStd', 'stnID',
+                                 'vLatency', 'diffAge', 'solAge', 'numStasVs',
+                                 'numSolSatVs', 'numGGL1', 'reserved',
+                                 'extSolStat', 'reserved2', 'sigMask',
+                                 'crc32'))
+
+
+class RingQueue(object):
+    """Bounded FIFO for a single producer and a single consumer thread.
+
+    Lighter replacement for ``queue.Queue`` to be used as the ``dataQueue``
+    argument of :meth:`Gps.begin`. Items are kept in a ``collections.deque``
+    whose ``append`` and ``popleft`` are atomic, so no mutex is taken to move
+    an item and the consumer is only signaled when it may be waiting.
+
+    Args:
+        maxsize (optional): maximum number of items kept. When full, putting a
+            new item discards the oldest one. Zero means unbounded.
+
+    Attributes:
+        dropped: number of items discarded because the queue was full.
+
+    .. note:: Only safe with one thread putting and one thread getting items.
+
+    """
+
+    def __init__(self, maxsize=0):
+        self._items = deque(maxlen=maxsize or None)
+        # waited on for both new items and close, so the consumer sleeps on
+        # a single primitive
+        self._cond = threading.Condition(threading.Lock())
+        self._closed = False
+        self._waiting = False  # consumer is (about to be) in wait_for
+        self.dropped = 0
+
+    def qsize(self):
+        """Return the number of items currently queued."""
+        return len(self._items)
+
+    def empty(self):
+        """Return True if there are no items queued."""
+        return not self._items
+
+    def put(self, item, block=True, timeout=None):
+        """Put item into the queue. Never blocks, if full oldest is dropped.
+
+        ``block`` and ``timeout`` are only accepted for compatibility with
+        ``queue.Queue``.
+        """
+        items = self._items
+        if len(items) == items.maxlen:
+            self.dropped += 1
+        items.append(item)
+        # lock is only taken if the consumer is sleeping. If it is not, it
+        # sets _waiting before looking at items, so it sees this item.
+        if self._waiting:
+            with self._cond:
+                # one item needs one consumer, never wake every waiter
+                self._cond.notify()
+
+    def put_nowait(self, item):
+        """Same as put(item)."""
+        self.put(item, False)
+
+    def close(self):
+        """Wake up the consumer for the last time.
+
+        Items already queued can still be read. Once they are all read,
+        get returns None instead of waiting, the same as getting a None put
+        as stop sentinel.
+        """
+        with self._cond:
+            self._closed = True
+            # every waiter has to see the queue closed
+            self._cond.notify_all()
+
+    def get(self, block=True, timeout=None):
+        """Remove and return the oldest item from the queue.
+
+        Args:
+            block: wait for an item if queue is empty.
+            timeout: maximum seconds to wait if block is True. None waits
+                forever.
+
+        Returns:
+            the oldest item, or None if the queue is empty and closed.
+
+        Raises:
+            queue.Empty: if no item was available.
+
+        """
+        items = self._items
+        try:
+            return items.popleft()
+        except IndexError:
+            pass
+        if self._closed:
+            return None
+        if not block or not self._wait(timeout):
+            raise queue.Empty
+        if items:
+            return items.popleft()
+        return None
+
+    def get_nowait(self):
+        """Same as get(False)."""
+        return self.get(False)
+
+    def getAll(self, block=True, timeout=None):
+        """Remove and return all queued items, oldest first.
+
+        Lets a consumer that fell behind handle everything queued in one
+        batch instead of one get per item.
+
+        Args:
+            block: wait for an item if queue is empty.
+            timeout: maximum seconds to wait if block is True. None waits
+                forever.
+
+        Returns:
+            list of items, empty if the queue is empty and closed.
+
+        Raises:
+            queue.Empty: if no item was available.
+
+        """
+        items = self._items
+        if not items:
+            if self._closed:
+                return []
+            if not block or not self._wait(timeout):
+                raise queue.Empty
+        # only this thread removes items, so all counted are still there
+        popleft = items.popleft
+        return [popleft() for _ in range(len(items))]
+
+    def _wait(self, timeout):
+        """Sleep until an item is queued or the queue is closed.
+
+        Returns:
+            False if timeout expired first.
+        """
+        items = self._items
+        with self._cond:
+            self._waiting = True
+            try:
+                return self._cond.wait_for(lambda: items or self._closed,
+                                           timeout)
+            finally:
+                self._waiting = False
 
 
 class Gps:
@@ -84,13 +387,13 @@ class Gps:
             header_keys: all field keys for the headers of messages.
             MessageID: A dictionary for the types of messages sent. Not all are
                 implemented yet!
+            droppedSamples: bestxyz messages discarded because a bounded
+                ``queue.Queue`` used as dataQueue was full. RingQueue counts
+                its own in ``RingQueue.dropped``.
 
     """
     #: all field keys for the headers of messages.
-    header_keys = ('sync', 'headerLength', 'messageID', 'messageType',
-                   'portAddress', 'messageLength', 'sequence', 'idleTime',
-                   'timeStatus', 'week', 'ms', 'receiverStatus', 'reserved',
-                   'swVersion')
+    header_keys = Header._fields
     #: A dictionary for the types of messages sent. Not all are implemented yet!
     MessageID = {'LOG': 1,
                  'COM': 4,
@@ -102,6 +405,34 @@ class Gps:
                  'DYNAMICS': 258,
                  'BESTXYZ': 241,
                  'SBASCONTROL': 652}
+    # precompiled layouts used on every received or sent message, so the
+    # format strings are parsed only once
+    _HDR = struct.Struct('<BHBBHHBBHlLHH')
+    _U32 = struct.Struct('<I')
+    # whole 112 bytes body of a BESTXYZ log
+    _BESTXYZ = struct.Struct('<IIdddfffIIdddfff4sfffBBBBBBBB')
+    _HDR_OUT = struct.Struct('<BBBBHBBHHBBHlLHH')
+    # body of each command, packed after the header
+    _UNLOGALL = struct.Struct('<LL')
+    _COM = struct.Struct('<8L')
+    _LOG = struct.Struct('<LHBBLddL')
+    _DYNAMICS = struct.Struct('<L')
+    _RESET = struct.Struct('<L')
+    _SBASCONTROL = struct.Struct('<LLLL')
+    # valid values of command arguments
+    _DYNAMICS_IDS = frozenset((0, 1, 2))
+    _SBAS_KEYWORDS = frozenset((0, 1))
+    _SBAS_SYSTEMS = frozenset(range(6))
+    _SBAS_TESTMODES = frozenset((0, 1, 2))
+    # messages whose only meaning is the response to a command, mapped to
+    # the order name of the command
+    _RESPONSE_ORDERS = {1: 'LOG',
+                        4: 'COM',
+                        18: 'RESET',
+                        19: 'SAVECONFIG',
+                        36: 'UNLOG',
+                        38: 'UNLOGALL',
+                        652: 'SBASCONTROL'}
 
     def __init__(self, sensorName="GPS"):
         self.myPort = ""
@@ -109,12 +440,20 @@ class Gps:
         self.baudRate = 9600  # current communication baudRate*/
         self.openError = 0  # if any error during any process occurs this will be set */
         self.dataQueue = None
+        self.callback = None
         self.name = sensorName
         self.isSet = False
         self.exitFlag = threading.Event()
-        self.orders = queue.Queue()
-        self.current_header = []
+        # Futures of commands waiting for their response, in sending order
+        # by order name. Responses nobody waits for are discarded
+        self._pending = {}
+        self._pendingLock = threading.Lock()
+        self.current_header = None
         self.Index = 1
+        self.droppedSamples = 0  # bestxyz discarded by a full dataQueue
+        self._unlogallCache = {}  # unlogall requests by (port, held)
+        # header of every command, only messageID and messageLength change
+        self._headerTemplate = self._HDR_OUT.pack(*self.create_header(0, 0))
 
     @staticmethod
     def CRC32Value(i):
@@ -130,8 +469,7 @@ class Gps:
             The CRC value calculated over the input message.
 
         """
-        crc = crcmod.mkCrcFun(0x104C11DB7, 0, True, 0)
-        return crc(i)
+        return _crc32(i)
 
     @staticmethod
     def getDebugMessage(message):
@@ -147,174 +485,197 @@ class Gps:
             A string of corresponding hex representation of message.
 
         """
-        debugMessage = (binascii.hexlify(message)).upper()
-        debugMessage = [debugMessage[i:i + 2] for i in range(0, len(debugMessage), 2)]
-        debugMessage = ' '.join('0x{}'.format(item) for item in debugMessage)
-        return debugMessage
+        # one table lookup per byte, no formatting of each one
+        return ' '.join(map(_HEX_BYTES.__getitem__, message))
+
+    def _readResponse(self, order, serialBuffer):
+        """Decode the body of a command response and hand it to its command.
+
+        The response completes the Future of the oldest command of the same
+        order still waiting, if any, otherwise it is logged and discarded.
+        Responses carry nothing to tell which command they answer, so a
+        response arriving after its command timed out completes the next
+        command of the same order if that one was already sent.
+
+        Args:
+            order: name of the command this response belongs to.
+            serialBuffer: message body followed by its crc, as described in
+                ``current_header``.
+        """
+        messageLength = self.current_header.messageLength
+        message = {'responseID': self._U32.unpack_from(serialBuffer, 0),
+                   'ascii': serialBuffer[4:messageLength],
+                   'crc32': self._U32.unpack_from(serialBuffer, messageLength)}
+        self.log.info("{0} response received : {1}".format(order, message['ascii']))
+        with self._pendingLock:
+            waiting = self._pending.get(order)
+            future = waiting.popleft() if waiting else None
+        if future is not None:
+            future.set_result(message)
+        else:
+            self.log.info("Discarding {0} response, no command waits for it".format(order))
+
+    def _expectResponse(self, order):
+        """Register a command about to be sent.
+
+        Must be called before writing the command, so its response can not
+        arrive before the registration.
+
+        Args:
+            order: name of the command, as used by the parser.
+
+        Returns:
+            A Future to be passed to :meth:`_waitResponse`.
+        """
+        future = concurrent.futures.Future()
+        with self._pendingLock:
+            self._pending.setdefault(order, deque()).append(future)
+        return future
+
+    def _waitResponse(self, order, future, timeout=5):
+        """Wait for the response of a command registered with _expectResponse.
+
+        Args:
+            order: name of the command, as used by the parser.
+            future: the object returned by :meth:`_expectResponse`.
+            timeout: seconds to wait for the response.
+
+        Returns:
+            The response message or None if it did not arrive in time.
+        """
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            with self._pendingLock:
+                waiting = self._pending.get(order)
+                if waiting and future in waiting:
+                    waiting.remove(future)
+            self.log.warning("No {0} response received".format(order))
+            return None
 
     def parseResponces(self):
         """
         A thread  to parse responses from device
         """
-        # used definitions for keys
-        bestxyz_keys = ('pSolStatus', 'posType', 'position', 'positionStd',
-                        'velSolStatus', 'velType', 'velocity', 'velocityStd',
-                        'stnID', 'vLatency', 'diffAge', 'solAge', 'numStasVs',
-                        'numSolSatVs', 'numGGL1', 'reserved', 'extSolStat',
-                        'reserved2', 'sigMask', 'crc32')
-
         self.log.info("Entering Thread logger")
         if(not self.isOpen):
             self.log.warning('Port is not open: {0}'.format(self.myPort))
             self.log.info("Exiting Thread logger")
             return
         MYPORT = self.myPort
-        # dataFile = self.dataFile
-        while(self.exitFlag.isSet() == False):
-            header = [0] * 14
-            newByte = ord(MYPORT.read(1))
-            if newByte == 0xAA:
-                header[0] = [0, 0, 0]
-                header[0][0] = newByte
-                header[0][1] = ord(MYPORT.read(1))
-                if header[0][1] == 0x44:
-                    header[0][2] = ord(MYPORT.read(1))
-                    if header[0][2] == 0x12:
-                        # got a valid header sync vector
-                        serialBuffer = MYPORT.read(25)
-                        header[1:] = struct.unpack('<BHBBHHBBHlLHH',
-                                                   serialBuffer)
-                        self.current_header = dict(zip(self.header_keys, header))
-                        header = self.current_header
-                        if header['messageID'] == self.MessageID['LOG']:
-                            message = [0] * 3
-                            message_keys = ('responseID', 'ascii', 'crc32')
-                            serialBuffer = MYPORT.read(4)
-                            message[0] = struct.unpack('<I', serialBuffer)
-                            message[1] = MYPORT.read(self.current_header['messageLength'] - 4)
-                            message[2] = MYPORT.read(4)
-                            message[2] = struct.unpack('<L', message[2])
-                            message = dict(zip(message_keys, message))
-                            self.log.info("LOG response received : {0}".format(message['ascii']))
-                            self.orders.put({'order': 'LOG', 'data': message})
-                        elif header['messageID'] == self.MessageID['UNLOGALL']:
-                            message = [0] * 3
-                            message_keys = ('responseID', 'ascii', 'crc32')
-                            serialBuffer = MYPORT.read(4)
-                            message[0] = struct.unpack('<I', serialBuffer)
-                            message[1] = MYPORT.read(self.current_header['messageLength'] - 4)
-                            message[2] = MYPORT.read(4)
-                            message[2] = struct.unpack('<L', message[2])
-                            message = dict(zip(message_keys, message))
-                            self.log.info("UNLOGALL response received : {0}".format(message['ascii']))
-                            self.orders.put({'order': 'UNLOGALL', 'data': message})
-                        elif header['messageID'] == self.MessageID['COM']:
-                            message = [0] * 3
-                            message_keys = ('responseID', 'ascii', 'crc32')
-                            serialBuffer = MYPORT.read(4)
-                            message[0] = struct.unpack('<I', serialBuffer)
-                            message[1] = MYPORT.read(self.current_header['messageLength'] - 4)
-                            message[2] = MYPORT.read(4)
-                            message[2] = struct.unpack('<L', message[2])
-                            message = dict(zip(message_keys, message))
-                            self.log.info("COM response received : {0}".format(message['ascii']))
-                            self.orders.put({'order': 'COM', 'data': message})
-                        elif header['messageID'] == self.MessageID['DYNAMICS']:
-                            # is message responce to command setDynamics?
-                            if header['messageType'] == 130:
-                                message = [0] * 3
-                                message_keys = ('responseID', 'ascii', 'crc32')
-                                serialBuffer = MYPORT.read(4)
-                                message[0] = struct.unpack('<I', serialBuffer)
-                                message[1] = MYPORT.read(self.current_header['messageLength'] - 4)
-                                message[2] = MYPORT.read(4)
-                                message[2] = struct.unpack('<L', message[2])
-                                message = dict(zip(message_keys, message))
-                                self.log.info("DYNAMICS response received : {0}".format(message['ascii']))
-                                self.orders.put({'order': 'DYNAMICS', 'data': message})
-                            else:
-                                # is a log dynamic response
-                                message = [0] * 2
-                                message_keys = ('dynamicID', 'crc32')
-                                serialBuffer = MYPORT.read(4)
-                                message[0] = struct.unpack('<L', serialBuffer)
-                                message[1] = MYPORT.read(4)
-                                message[1] = struct.unpack('<L', message[1])
-                                message = dict(zip(message_keys, message))
-                                self.log.info("DYNAMICS response received : dynamicID={0}".format(message['dynamicID'][0]))
-                        elif header['messageID'] == self.MessageID['RESET']:
-                            message = [0] * 3
-                            message_keys = ('responseID', 'ascii', 'crc32')
-                            serialBuffer = MYPORT.read(4)
-                            message[0] = struct.unpack('<I', serialBuffer)
-                            message[1] = MYPORT.read(self.current_header['messageLength'] - 4)
-                            message[2] = MYPORT.read(4)
-                            message[2] = struct.unpack('<L', message[2])
-                            message = dict(zip(message_keys, message))
-                            self.log.info("RESET response received : {0}".format(message['ascii']))
-                            self.orders.put({'order': 'RESET', 'data': message})
-                        elif header['messageID'] == self.MessageID['SAVECONFIG']:
-                            message = [0] * 3
-                            message_keys = ('responseID', 'ascii', 'crc32')
-                            serialBuffer = MYPORT.read(4)
-                            message[0] = struct.unpack('<I', serialBuffer)
-                            message[1] = MYPORT.read(self.current_header['messageLength'] - 4)
-                            message[2] = MYPORT.read(4)
-                            message[2] = struct.unpack('<L', message[2])
-                            message = dict(zip(message_keys, message))
-                            self.log.info("SAVECONFIG response received : {0}".format(message['ascii']))
-                            self.orders.put({'order': 'SAVECONFIG', 'data': message})
-                        elif header['messageID'] == self.MessageID['SBASCONTROL']:
-                            message = [0] * 3
-                            message_keys = ('responseID', 'ascii', 'crc32')
-                            serialBuffer = MYPORT.read(4)
-                            message[0] = struct.unpack('<I', serialBuffer)
-                            message[1] = MYPORT.read(self.current_header['messageLength'] - 4)
-                            message[2] = MYPORT.read(4)
-                            message[2] = struct.unpack('<L', message[2])
-                            message = dict(zip(message_keys, message))
-                            self.log.info("SBASCONTROL response received : {0}".format(message['ascii']))
-                            self.orders.put({'order': 'SBASCONTROL', 'data': message})
-                        elif header['messageID'] == self.MessageID['BESTXYZ']:
-                            message = [0] * 20
-                            serialBuffer = MYPORT.read(self.current_header['messageLength'])
-                            message[0:2] = struct.unpack('<II', serialBuffer[0:8])
-                            message[2] = [0, 0, 0]
-                            message[2][0:] = struct.unpack('<ddd', serialBuffer[8:32])
-                            message[3] = [0, 0, 0]
-                            message[3][0:] = struct.unpack('<fff', serialBuffer[32:44])
-                            message[4:6] = struct.unpack('<II', serialBuffer[44:52])
-                            message[6] = [0, 0, 0]
-                            message[6][0:] = struct.unpack('<ddd', serialBuffer[52:76])
-                            message[7] = [0, 0, 0]
-                            message[7][0:] = struct.unpack('<fff', serialBuffer[76:88])
-                            message[8] = serialBuffer[88:92]
-                            message[9:12] = struct.unpack('<fff', serialBuffer[92:104])
-                            message[12:15] = struct.unpack('<3B', serialBuffer[104:107])
-                            message[15] = [0, 0]
-                            message[15][0:] = struct.unpack('<2B', serialBuffer[107:109])
-                            message[16:19] = struct.unpack('<3B', serialBuffer[109:112])
-                            serialBuffer = MYPORT.read(4)  # crc32
-                            message[19] = struct.unpack('<I', serialBuffer)
-                            message = dict(zip(bestxyz_keys, message))
-                            currentTime = datetime.now()
-                            myTime = '{0:%Y-%m-%d %H:%M:%S}'.format(currentTime) + '.{0:02.0f}'.format(round(currentTime.microsecond / 10000.0))
-                            outMessage = dict(Index=self.Index, Time=myTime)
-                            outMessage.update(message)
+        # bind names used for every message once, outside the loop
+        exitIsSet = self.exitFlag.is_set
+        read = MYPORT.read
+        makeHeader = Header._make
+        unpackHeader = self._HDR.unpack_from
+        unpackU32 = self._U32.unpack_from
+        unpackBestXYZ = self._BESTXYZ.unpack_from
+        responseOrder = self._RESPONSE_ORDERS.get
+        dynamicsID = self.MessageID['DYNAMICS']
+        bestxyzID = self.MessageID['BESTXYZ']
+        # builds a BestXYZ from a tuple of all its fields, without the
+        # python level argument handling of BestXYZ(...)
+        newBestXYZ = tuple.__new__
+        # bytes received but not parsed yet. Reading everything available
+        # at once and splitting it in frames with _splitFrames avoids a read
+        # call per byte and moves the remaining bytes only once per read.
+        rxBuffer = bytearray()
+        drainUntil = None
+        while True:
+            if not exitIsSet():
+                rxBuffer += read(max(1, MYPORT.in_waiting))
+            else:
+                # on exit only finish a message already started, e.g. the
+                # response to the unlogall shutdown wakes this thread with,
+                # even if its first byte arrived alone. _splitFrames leaves
+                # bytes in rxBuffer only if they may start a valid message.
+                # Never wait more than 1 s for the rest and never block on
+                # a read, the receiver may have gone silent.
+                if not rxBuffer:
+                    break
+                if drainUntil is None:
+                    drainUntil = monotonic() + 1.0
+                elif monotonic() > drainUntil:
+                    break
+                waiting = MYPORT.in_waiting
+                if not waiting:
+                    sleep(0.001)
+                    continue
+                rxBuffer += read(waiting)
+            frames, consumed = _splitFrames(rxBuffer)
+            pos = 0
+            for start, end in frames:
+                if start > pos:
+                    self.log.debug("Discarding {0} unexpected bytes".format(start - pos))
+                pos = end
+                header = makeHeader(((0xAA, 0x44, 0x12),) +
+                                    unpackHeader(rxBuffer, start + 3))
+                self.current_header = header
+                messageLength = header.messageLength
+                body = start + 28
+                # body and crc are decoded straight from rxBuffer, only
+                # command responses get their own copy
+                order = responseOrder(header.messageID)
+                if order is not None:
+                    self._readResponse(order, bytes(rxBuffer[body:end]))
+                elif header.messageID == dynamicsID:
+                    # is message responce to command setDynamics?
+                    if header.messageType == 130:
+                        self._readResponse('DYNAMICS', bytes(rxBuffer[body:end]))
+                    else:
+                        # is a log dynamic response
+                        message = {'dynamicID': unpackU32(rxBuffer, body),
+                                   'crc32': unpackU32(rxBuffer, body + messageLength)}
+                        self.log.info("DYNAMICS response received : dynamicID={0}".format(message['dynamicID'][0]))
+                elif header.messageID == bestxyzID:
+                    # decode the whole body in one go and build the sample
+                    # straight from it. Vector fields are tuple slices and
+                    # no intermediate list is made, every sample costs the
+                    # namedtuple and its four vectors only. Samples are
+                    # handed to another thread, so they are not pooled and
+                    # reused.
+                    vals = unpackBestXYZ(rxBuffer, body)
+                    # reception time as integer nanoseconds since epoch
+                    outMessage = newBestXYZ(
+                        BestXYZ, (self.Index, time_ns(), vals[0], vals[1],
+                                  vals[2:5], vals[5:8], vals[8], vals[9],
+                                  vals[10:13], vals[13:16], vals[16],
+                                  vals[17], vals[18], vals[19], vals[20],
+                                  vals[21], vals[22], vals[23:25],
+                                  vals[25], vals[26], vals[27],
+                                  unpackU32(rxBuffer, body + messageLength)))
+                    if self.callback is not None:
+                        # handled right here, no queue and no thread switch
+                        try:
+                            self.callback(outMessage)
+                        except Exception:
+                            self.log.exception("Error in bestxyz callback")
+                    elif self.dataQueue is not None:
+                        try:
+                            self.dataQueue.put_nowait(outMessage)
+                        except queue.Full:
+                            # bounded queue and consumer is lagging:
+                            # drop the oldest sample, never block here
+                            self.droppedSamples += 1
+                            try:
+                                self.dataQueue.get_nowait()
+                            except queue.Empty:
+                                pass
                             self.dataQueue.put_nowait(outMessage)
 
-                            self.Index = self.Index + 1
-                        else:
-                            # .. todo:: error processing.
-                            pass
-            else:
-                self.log.debug("New Byte unexpected: 0x{0:X}".format(newByte))
+                    self.Index = self.Index + 1
+                else:
+                    # .. todo:: error processing.
+                    pass
+            if consumed > pos:
+                self.log.debug("Discarding {0} unexpected bytes".format(consumed - pos))
+            del rxBuffer[:consumed]
         self.log.info("Exiting Thread logger")
         return
 
-    def begin(self, dataQueue,
+    def begin(self, dataQueue=None,
               comPort="/dev/ttyUSB0",
-              baudRate=9600):
+              baudRate=9600, callback=None):
         """ Initializes the gps receiver.
 
         This function resets the current port to factory default and setup the
@@ -323,9 +684,14 @@ class Gps:
 
         Args:
             comPort: system port where receiver is connected.
-            dataQueue: a Queue object to store incoming bestxyz messages.
+            dataQueue: a Queue or RingQueue object to store incoming bestxyz
+                messages. If it is bounded and gets full, the oldest message is
+                discarded. If None, bestxyz messages are parsed and dropped.
             baudRate: baudrate to configure port. (should always be equal to
                 factory default of receiver).
+            callback: function called with each bestxyz message instead of
+                putting it on dataQueue. It runs in the parser thread, so it
+                must return quickly.
 
         Returns:
             True or False if the setup has gone as expected or not.
@@ -379,6 +745,7 @@ class Gps:
             self.isOpen = True
             # open dataFile to save GPS data
             self.dataQueue = dataQueue
+            self.callback = callback
             # start thread to handle GPS responces
             self.threadID = threading.Thread(name="Logger", target=self.parseResponces)
             self.threadID.start()
@@ -469,6 +836,44 @@ class Gps:
         header[7] = messageLength
         return header
 
+    def _packFrame(self, buffer, offset, messageID, body=None, values=()):
+        """Write a complete command into buffer: header, body and crc.
+
+        The header is the one of :meth:`create_header` with default
+        portAddress, copied from a template built once. Only messageID and
+        messageLength are set.
+
+        Args:
+            buffer: bytearray where the command is built. From offset it
+                needs room for the header, the body and the crc.
+            offset: position of the command in buffer.
+            messageID: the corresponding value of identifying the message body.
+            body: struct.Struct of the message body or None if it has no body.
+            values: values of the body fields.
+
+        Returns:
+            The position in buffer right after the command.
+        """
+        messageLength = body.size if body is not None else 0
+        end = offset + 28 + messageLength
+        buffer[offset:offset + 28] = self._headerTemplate
+        _U16.pack_into(buffer, offset + 4, messageID)
+        _U16.pack_into(buffer, offset + 8, messageLength)
+        if body is not None:
+            body.pack_into(buffer, offset + 28, *values)
+        self._U32.pack_into(buffer, end, _crc32(memoryview(buffer)[offset:end]))
+        return end + 4
+
+    def _buildFrame(self, messageID, body=None, values=()):
+        """Return a new bytearray with a complete command.
+
+        See :meth:`_packFrame` for the arguments.
+        """
+        messageLength = body.size if body is not None else 0
+        finalMessage = bytearray(28 + messageLength + 4)
+        self._packFrame(finalMessage, 0, messageID, body, values)
+        return finalMessage
+
     def sendUnlogall(self, port=8, held=1):
         """Send command unlogall to gps device.
 
@@ -498,31 +903,30 @@ class Gps:
         if self.isOpen:
             MYPORT = self.myPort
 
-            messageSize = 8  # 2 * ENUM
-            header = self.create_header(messageID=38,
-                                        messageLength=messageSize)
-            myMessage = struct.pack('<BBBBHBBHHBBHlLHH', *header)
-            myMessage = myMessage + struct.pack('<LL', port, held)
-            crc_value = self.CRC32Value(myMessage)
-            finalMessage = myMessage + struct.pack('<L', crc_value)
+            # the request only depends on the arguments, build it once
+            finalMessage = self._unlogallCache.get((port, held))
+            if finalMessage is None:
+                finalMessage = self._buildFrame(self.MessageID['UNLOGALL'],
+                                                self._UNLOGALL, (port, held))
+                self._unlogallCache[(port, held)] = finalMessage
 
             # print messages to logFile
             self.log.info("Requested unlogall")
-            self.log.debug('Message sent to GPS: {0}'.format(self.getDebugMessage(finalMessage)))
+            if self.log.isEnabledFor(logging.DEBUG):
+                self.log.debug('Message sent to GPS: %s', self.getDebugMessage(finalMessage))
+            future = self._expectResponse('UNLOGALL')
             MYPORT.write(finalMessage)
             MYPORT.flush()
 
-            # wait for data on queue with response
-            message = self.orders.get()
-            if message['order'] == 'UNLOGALL':
-                message = message['data']
-                self.log.info("Unlogall response received : {0}".format(message['ascii']))
-                if message['responseID'][0] == 1:
-                    return True
-                else:
-                    return False
+            # wait for the response to this command
+            message = self._waitResponse('UNLOGALL', future)
+            if message is None:
+                return False
+            self.log.info("Unlogall response received : {0}".format(message['ascii']))
+            if message['responseID'][0] == 1:
+                return True
             else:
-                self.log.warning("Unexpected responce type: {0}".format(message['order']))
+                return False
         else:
             self.log.info("Port not open. Couldn't request unlogall command")
             return False
@@ -626,19 +1030,24 @@ class Gps:
         """
         if self.isOpen:
             MYPORT = self.myPort
-            messageSize = 32  # 32bytes length
-            header = self.create_header(messageID=4, messageLength=messageSize)
-            myMessage = struct.pack('<BBBBHBBHHBBHlLHH', *header)
-            myMessage = myMessage + struct.pack('<8L', port, baud, parity, databits,
-                                                stopbits, handshake, echo, breakCond)
-            crc_value = self.CRC32Value(myMessage)
-            finalMessage = myMessage + struct.pack('<L', crc_value)
+            finalMessage = self._buildFrame(self.MessageID['COM'], self._COM,
+                                            (port, baud, parity, databits,
+                                             stopbits, handshake, echo, breakCond))
             self.log.info("Requested Com command")
-            self.log.debug('Message sent to GPS: {0}'.format(self.getDebugMessage(finalMessage)))
+            if self.log.isEnabledFor(logging.DEBUG):
+                self.log.debug('Message sent to GPS: %s', self.getDebugMessage(finalMessage))
+            future = self._expectResponse('COM')
             MYPORT.write(finalMessage)
             MYPORT.flush()
+            # receiver answers with current settings and only then changes
+            # them, so ours can be changed as soon as the response arrives
             self.log.info("waiting for port settings to change")
-            sleep(1)
+            message = self._waitResponse('COM', future, timeout=2)
+            if message is None:
+                self.log.warning("Changing port settings anyway")
+            elif message['responseID'][0] != 1:
+                self.log.warning("COM command refused: {0}".format(message['ascii']))
+                return False
             portOptions = MYPORT.get_settings()
             # change port settings
             portOptions['baudrate'] = baud
@@ -732,31 +1141,62 @@ class Gps:
         |       |           | | input                                         |
         +-------+-----------+-------------------------------------------------+
 
+        """
+        return self.askLogs([{'logID': logID, 'port': port, 'trigger': trigger,
+                              'period': period, 'offset': offset, 'hold': hold}])
+
+    def askLogs(self, specs):
+        """Request several logs from receiver at once.
+
+        All log requests are sent in a single write and their responses are
+        waited for afterwards, instead of a full round trip per log.
+
+        Args:
+            specs: list of dicts with the arguments of :meth:`askLog` for each
+                log. Missing arguments take the askLog default values.
+
+        Returns:
+            True if all logs were accepted, false otherwise.
+
+        :Example:
+          .. code-block:: python
+
+              gps.askLogs([{'logID': 'BESTXYZ', 'trigger': 2, 'period': 0.1},
+                           {'logID': 'DYNAMICS', 'trigger': 4}])
+
         """
         if self.isOpen:
             MYPORT = self.myPort
-            messageSize = 32
-            header = self.create_header(messageID=1, messageLength=messageSize)
-            myMessage = struct.pack('<BBBBHBBHHBBHlLHH', *header)
-            myMessage = myMessage + struct.pack('<LHBBLddL', port, self.MessageID[logID],
-                                                0, 0, trigger, period, offset, hold)
-            crc_value = self.CRC32Value(myMessage)
-            finalMessage = myMessage + struct.pack('<L', crc_value)
+            # all requests packed back to back in a single buffer, each one
+            # followed by its crc
+            finalMessage = bytearray((28 + self._LOG.size + 4) * len(specs))
+            offset = 0
+            for spec in specs:
+                options = {'logID': 'BESTXYZ', 'port': 192, 'trigger': 4,
+                           'period': 0, 'offset': 0, 'hold': 0}
+                options.update(spec)
+                offset = self._packFrame(finalMessage, offset,
+                                         self.MessageID['LOG'], self._LOG,
+                                         (options['port'],
+                                          self.MessageID[options['logID']], 0, 0,
+                                          options['trigger'], options['period'],
+                                          options['offset'], options['hold']))
             self.log.info("Requested Log command")
-            self.log.debug('Message sent to GPS: {0}'.format(self.getDebugMessage(finalMessage)))
+            if self.log.isEnabledFor(logging.DEBUG):
+                self.log.debug('Message sent to GPS: %s', self.getDebugMessage(finalMessage))
+            futures = [self._expectResponse('LOG') for _ in specs]
             MYPORT.write(finalMessage)
-            MYPORT.flush()
-            # wait for responce
-            message = self.orders.get()
-            if message['order'] == 'LOG':
-                message = message['data']
+            # wait for the responses, they come in the order of the requests
+            success = True
+            for future in futures:
+                message = self._waitResponse('LOG', future)
+                if message is None:
+                    success = False
+                    continue
                 self.log.info("LOG response received : {0}".format(message['ascii']))
-                if message['responseID'][0] == 1:
-                    return True
-                else:
-                    return False
-            else:
-                self.log.warning("Unexpected responce type: {0}".format(message['order']))
+                if message['responseID'][0] != 1:
+                    success = False
+            return success
         else:
             self.log.info("Port not open. Couldn't request LOG command")
             return False
@@ -823,33 +1263,27 @@ class Gps:
 
         """
         if self.isOpen:
-            if dynamicID in [0, 1, 2]:
+            if dynamicID in self._DYNAMICS_IDS:
                 MYPORT = self.myPort
-                messageSize = 4  # ENUM
-                header = self.create_header(messageID=self.MessageID['DYNAMICS'],
-                                            messageLength=messageSize)
-                myMessage = struct.pack('<BBBBHBBHHBBHlLHH', *header)
-                myMessage = myMessage + struct.pack('<L', dynamicID)
-                crc_value = self.CRC32Value(myMessage)
-                finalMessage = myMessage + struct.pack('<L', crc_value)
+                finalMessage = self._buildFrame(self.MessageID['DYNAMICS'],
+                                                self._DYNAMICS, (dynamicID,))
 
                 # print messages to logFile
                 self.log.info("Requested dynamics")
-                self.log.debug('Message sent to GPS: {0}'.format(self.getDebugMessage(finalMessage)))
+                if self.log.isEnabledFor(logging.DEBUG):
+                    self.log.debug('Message sent to GPS: %s', self.getDebugMessage(finalMessage))
+                future = self._expectResponse('DYNAMICS')
                 MYPORT.write(finalMessage)
-                MYPORT.flush()
-
-                # wait for data on queue with response
-                message = self.orders.get()
-                if message['order'] == 'DYNAMICS':
-                    message = message['data']
-                    self.log.info("DYNAMICS response received : {0}".format(message['ascii']))
-                    if message['responseID'][0] == 1:
-                        return True
-                    else:
-                        return False
+
+                # wait for the response to this command
+                message = self._waitResponse('DYNAMICS', future)
+                if message is None:
+                    return False
+                self.log.info("DYNAMICS response received : {0}".format(message['ascii']))
+                if message['responseID'][0] == 1:
+                    return True
                 else:
-                    self.log.warning("Unexpected responce type: {0}".format(message['order']))
+                    return False
             else:
                 self.log.info("dynamicID not valid")
                 return False
@@ -912,7 +1346,7 @@ class Gps:
 #             if switchID in [0, 1, 2]:
 #                 MYPORT = self.myPort
 #                 messageSize = 4  # ENUM
-#                 header = self.create_header(messageID=self.MessageID('PDPFILTER'),
+#                 header = self.create_header(messageID=self.MessageID['PDPFILTER'],
 #                                             messageLength=messageSize)
 #                 myMessage = struct.pack('<BBBBHBBHHBBHlLHH', *header)
 #                 myMessage = myMessage + struct.pack('<L', switchID)
@@ -977,31 +1411,25 @@ class Gps:
         """
         if self.isOpen:
             MYPORT = self.myPort
-            messageSize = 4  # Ulong
-            header = self.create_header(messageID=self.MessageID['RESET'],
-                                        messageLength=messageSize)
-            myMessage = struct.pack('<BBBBHBBHHBBHlLHH', *header)
-            myMessage = myMessage + struct.pack('<L', delay)
-            crc_value = self.CRC32Value(myMessage)
-            finalMessage = myMessage + struct.pack('<L', crc_value)
+            finalMessage = self._buildFrame(self.MessageID['RESET'],
+                                            self._RESET, (delay,))
 
             # print messages to logFile
             self.log.info("Requested Reset")
-            self.log.debug('Message sent to GPS: {0}'.format(self.getDebugMessage(finalMessage)))
+            if self.log.isEnabledFor(logging.DEBUG):
+                self.log.debug('Message sent to GPS: %s', self.getDebugMessage(finalMessage))
+            future = self._expectResponse('RESET')
             MYPORT.write(finalMessage)
-            MYPORT.flush()
 
-            # wait for data on queue with response
-            message = self.orders.get()
-            if message['order'] == 'RESET':
-                message = message['data']
-                self.log.info("RESET response received : {0}".format(message['ascii']))
-                if message['responseID'][0] == 1:
-                    return True
-                else:
-                    return False
+            # wait for the response to this command
+            message = self._waitResponse('RESET', future)
+            if message is None:
+                return False
+            self.log.info("RESET response received : {0}".format(message['ascii']))
+            if message['responseID'][0] == 1:
+                return True
             else:
-                self.log.warning("Unexpected responce type: {0}".format(message['order']))
+                return False
         else:
             self.log.info("Port not open. Couldn't request RESET command")
             return False
@@ -1029,30 +1457,25 @@ class Gps:
             """
             if self.isOpen:
                 MYPORT = self.myPort
-                messageSize = 0  # Ulong
-                header = self.create_header(messageID=self.MessageID['SAVECONFIG'],
-                                            messageLength=messageSize)
-                myMessage = struct.pack('<BBBBHBBHHBBHlLHH', *header)
-                crc_value = self.CRC32Value(myMessage)
-                finalMessage = myMessage + struct.pack('<L', crc_value)
+                # no message body
+                finalMessage = self._buildFrame(self.MessageID['SAVECONFIG'])
 
                 # print messages to logFile
                 self.log.info("Requested SAVECONFIG")
-                self.log.debug('Message sent to GPS: {0}'.format(self.getDebugMessage(finalMessage)))
+                if self.log.isEnabledFor(logging.DEBUG):
+                    self.log.debug('Message sent to GPS: %s', self.getDebugMessage(finalMessage))
+                future = self._expectResponse('SAVECONFIG')
                 MYPORT.write(finalMessage)
-                MYPORT.flush()
-
-                # wait for data on queue with response
-                message = self.orders.get()
-                if message['order'] == 'SAVECONFIG':
-                    message = message['data']
-                    self.log.info("SAVECONFIG response received : {0}".format(message['ascii']))
-                    if message['responseID'][0] == 1:
-                        return True
-                    else:
-                        return False
+
+                # wait for the response to this command
+                message = self._waitResponse('SAVECONFIG', future)
+                if message is None:
+                    return False
+                self.log.info("SAVECONFIG response received : {0}".format(message['ascii']))
+                if message['responseID'][0] == 1:
+                    return True
                 else:
-                    self.log.warning("Unexpected responce type: {0}".format(message['order']))
+                    return False
             else:
                 self.log.info("Port not open. Couldn't request SAVCONFIG command")
                 return False
@@ -1134,33 +1557,34 @@ class Gps:
             setting.
             """
             if self.isOpen:
+                # refuse values receiver would reject, without a round trip
+                if (keywordID not in self._SBAS_KEYWORDS or
+                        systemID not in self._SBAS_SYSTEMS or
+                        not (prn == 0 or 120 <= prn <= 138) or
+                        testmode not in self._SBAS_TESTMODES):
+                    self.log.info("sbascontrol arguments not valid")
+                    return False
                 MYPORT = self.myPort
-                messageSize = 0  # Ulong
-                header = self.create_header(messageID=self.MessageID['SBASCONTROL'],
-                                            messageLength=messageSize)
-                myMessage = struct.pack('<BBBBHBBHHBBHlLHH', *header)
-                myMessage = myMessage + struct.pack('<LLLL', keywordID, systemID,
-                                                    prn, testmode)
-                crc_value = self.CRC32Value(myMessage)
-                finalMessage = myMessage + struct.pack('<L', crc_value)
+                finalMessage = self._buildFrame(self.MessageID['SBASCONTROL'],
+                                                self._SBASCONTROL,
+                                                (keywordID, systemID, prn, testmode))
 
                 # print messages to logFile
                 self.log.info("Requested SBASCONTROL")
-                self.log.debug('Message sent to GPS: {0}'.format(self.getDebugMessage(finalMessage)))
+                if self.log.isEnabledFor(logging.DEBUG):
+                    self.log.debug('Message sent to GPS: %s', self.getDebugMessage(finalMessage))
+                future = self._expectResponse('SBASCONTROL')
                 MYPORT.write(finalMessage)
-                MYPORT.flush()
-
-                # wait for data on queue with response
-                message = self.orders.get()
-                if message['order'] == 'SBASCONTROL':
-                    message = message['data']
-                    self.log.info("SBASCONTROL response received : {0}".format(message['ascii']))
-                    if message['responseID'][0] == 1:
-                        return True
-                    else:
-                        return False
+
+                # wait for the response to this command
+                message = self._waitResponse('SBASCONTROL', future)
+                if message is None:
+                    return False
+                self.log.info("SBASCONTROL response received : {0}".format(message['ascii']))
+                if message['responseID'][0] == 1:
+                    return True
                 else:
-                    self.log.warning("Unexpected responce type: {0}".format(message['order']))
+                    return False
             else:
                 self.log.info("Port not open. Couldn't request SBASCONTROL command")
                 return False
@@ -1180,8 +1604,16 @@ class Gps:
         """
         self.sendUnlogall()
         self.exitFlag.set()
+        # the parser thread may be blocked reading the port. This response
+        # wakes it up and is parsed before it exits, so it is received
+        # right away and never left to the response timeout.
         self.sendUnlogall()
+        # in case the receiver did not answer, stop a read still blocked
+        self.myPort.cancel_read()
         self.threadID.join()
+        dropped = self.droppedSamples + getattr(self.dataQueue, 'dropped', 0)
+        if dropped:
+            self.log.warning("{0} bestxyz messages dropped, dataQueue was full".format(dropped))
         # reset port settings to default
         self.myPort.break_condition = True
         self.myPort.send_break()
@@ -1194,6 +1626,18 @@ class Gps:
         return True
 
 
+# console line of a sample printed by main, %-formatting is done in C
+_FMT = '%5d,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s\n'
+# fields of a sample written by main, fetched with a single C call
+_SAMPLE_FIELDS = operator.attrgetter('Index', 'Time', 'pSolStatus', 'position',
+                                     'positionStd', 'velSolStatus', 'velocity',
+                                     'velocityStd', 'vLatency', 'solAge',
+                                     'numSolSatVs')
+# binary record of a sample saved by main --binary. Same layout as RECORD
+# of examples/bin2csv.py, which converts these files to csv offline
+_RECORD = struct.Struct('<IQI3d3fI3d3fffB')
+
+
 def main():
     """Set of test to run to see if class behaves as expected.
 
@@ -1203,52 +1647,104 @@ def main():
     - sendUnlogall
     - setCom(baud=115200): changes baudrate to 115200bps
     - askLog(trigger=2, period=0.1): ask for log *bestxyz* with trigger `ONTIME` and period `0.1`
-    - wait for 10 seconds
+    - wait for 100 samples (``-c``), or at most 15 seconds
     - shutdown: safely disconnects from gps receiver
 
+    Samples are written as csv to the console or to the file given by
+    ``-o``. With ``--binary`` they are only packed while receiving, and the
+    float to text conversion is done afterwards, in another process, by
+    examples/bin2csv.py.
+
     """
     import argparse
+    import logging.handlers
 
-    def printData(dataQueue, exitFlag):
-        """ prints data to console
+    def writeData(out):
+        """ creates the callback writing data to console or file
 
-        Thread used to print data from request log (bestxyz) to the console.
+        Lines of request log (bestxyz) are formatted from the parser thread
+        as they arrive and written to out in batches of 50, with a single
+        write and flush.
 
         Args:
-            dataQueue: queue class object where data is stored
-            exitFlag: a flag to control the exit of program gracefully
+            out: text file object where data is written.
+
+        Returns:
+            function to be used as callback of Gps.begin and function
+            writing the lines of an incomplete batch, to be called once the
+            parser thread is stopped.
 
         """
-        print("Index,Time,PSolStatus,X,Y,Z,stdX,stdY,stdZ,VSolStatus,VX,VY,VZ,stdVX,stdVY,stdVZ,VLatency,SolAge,SolSatNumber\n")
-        while(exitFlag.isSet() == False):
-            if(dataQueue.empty() == False):
-                newData = dataQueue.get()
-                print('{0:5d},{1},{2},{3},{4},{5},'
-                      '{6},{7},{8},{9},{10},{11},'
-                      '{12},{13},{14},{15},{16},'
-                      '{17},{18}\n'.format(newData['Index'],
-                                           newData['Time'],
-                                           newData['pSolStatus'],
-                                           newData['position'][0],
-                                           newData['position'][1],
-                                           newData['position'][2],
-                                           newData['positionStd'][0],
-                                           newData['positionStd'][1],
-                                           newData['positionStd'][2],
-                                           newData['velSolStatus'],
-                                           newData['velocity'][0],
-                                           newData['velocity'][1],
-                                           newData['velocity'][2],
-                                           newData['velocityStd'][0],
-                                           newData['velocityStd'][1],
-                                           newData['velocityStd'][2],
-                                           newData['vLatency'],
-                                           newData['solAge'],
-                                           newData['numSolSatVs']
-                                           ))
-            else:
-                sleep(0.1)
-        return
+        lines = []
+        append = lines.append
+        getFields = _SAMPLE_FIELDS
+        lastSecond = None
+        secondStr = None
+
+        def finish():
+            out.write(''.join(lines))
+            out.flush()
+            lines.clear()
+
+        def callback(newData):
+            nonlocal lastSecond, secondStr
+            # Time is in ns, show it as local date with centiseconds.
+            # Several samples share the same second, strftime is only
+            # called when it changes.
+            (index, sampleTime, pSolStatus, p, ps, velSolStatus, v, vs,
+             vLatency, solAge, numSolSatVs) = getFields(newData)
+            second, ns = divmod(sampleTime, 1000000000)
+            if second != lastSecond:
+                lastSecond = second
+                secondStr = strftime('%Y-%m-%d %H:%M:%S', localtime(second))
+            myTime = '%s.%02d' % (secondStr, ns // 10000000)
+            append(_FMT % (index, myTime, pSolStatus,
+                           p[0], p[1], p[2], ps[0], ps[1], ps[2],
+                           velSolStatus, v[0], v[1], v[2],
+                           vs[0], vs[1], vs[2], vLatency, solAge,
+                           numSolSatVs))
+            if len(lines) >= 50:
+                finish()
+
+        out.write("Index,Time,PSolStatus,X,Y,Z,stdX,stdY,stdZ,VSolStatus,VX,VY,VZ,stdVX,stdVY,stdVZ,VLatency,SolAge,SolSatNumber\n")
+        return callback, finish
+
+    def writeRecords(out):
+        """ creates the callback writing binary records to a file
+
+        Same as writeData but samples are packed, without any float to
+        text conversion, as ``_RECORD`` structs. Use examples/bin2csv.py to
+        convert them to csv afterwards.
+
+        Args:
+            out: binary file object where records are written.
+
+        Returns:
+            callback and finish functions, see writeData.
+
+        """
+        records = []
+        append = records.append
+        pack = _RECORD.pack
+        getFields = _SAMPLE_FIELDS
+
+        def finish():
+            out.write(b''.join(records))
+            out.flush()
+            records.clear()
+
+        def callback(newData):
+            (index, sampleTime, pSolStatus, p, ps, velSolStatus, v, vs,
+             vLatency, solAge, numSolSatVs) = getFields(newData)
+            append(pack(index, sampleTime, pSolStatus,
+                        p[0], p[1], p[2], ps[0], ps[1], ps[2],
+                        velSolStatus, v[0], v[1], v[2],
+                        vs[0], vs[1], vs[2], vLatency, solAge,
+                        numSolSatVs))
+            if len(records) >= 50:
+                finish()
+
+        return callback, finish
 
     # -------------------------------------------------------------------------
     # Start of the main program
@@ -1257,9 +1753,18 @@ def main():
     parser = argparse.ArgumentParser(add_help=True,
                                      description='Novatel GPS receiver interface library')
     parser.add_argument("-p", "--port", action="store", type=str,
-                      dest="port", default="/dev/ttyUSB0", help='serial port used')
+                        dest="port", default="/dev/ttyUSB0", help='serial port used')
     parser.add_argument("-n", "--name", action="store", type=str,
-                      dest="name", default="GPS1", help='ID of sensor, in case of multiple units')
+                        dest="name", default="GPS1", help='ID of sensor, in case of multiple units')
+    parser.add_argument("-o", "--output", action="store", type=str,
+                        dest="output", default=None,
+                        help='csv file to save data (default console)')
+    parser.add_argument("-b", "--binary", action="store_true", dest="binary",
+                        help='save binary records instead of csv. Use '
+                             'examples/bin2csv.py to convert them afterwards')
+    parser.add_argument("-c", "--count", action="store", type=int,
+                        dest="count", default=100,
+                        help='number of samples to receive before exiting')
     parser.add_argument('--log', action='store', type=str, dest='log', default='output.log',
                         help='log file to be used')
     parser.add_argument("--log-level", action="store", type=str,
@@ -1269,68 +1774,94 @@ def main():
 
     args = parser.parse_args()
 
-    log_Level = {'error': logging.ERROR,
-                 'debug': logging.DEBUG,
-                 'info': logging.INFO,
-                 'warning': logging.WARNING,
-                 'critical': logging.CRITICAL
-                 }
-
-    logging.basicConfig(filename=args.log,
-                        level=log_Level[args.logLevel],
-                        format='[%(asctime)s] [%(threadName)-10s] %(levelname)-8s %(message)s',
-                        filemode="w")
+    # choices of --log-level are the lower case names of logging levels
+    logLevel = getattr(logging, args.logLevel.upper())
 
     # ---------------------------------------------------------------------------
-    # define a Handler which writes INFO messages or higher in console
+    # log to file and console from a listener thread. Loggers only put
+    # records on a queue, so the parser thread never waits for log I/O
     # ---------------------------------------------------------------------------
+    logFile = logging.FileHandler(args.log, mode='w')
+    logFile.setFormatter(logging.Formatter('[%(asctime)s] [%(threadName)-10s] %(levelname)-8s %(message)s'))
+    # define a Handler which writes messages in console
     console = logging.StreamHandler()
-    console.setLevel(log_Level[args.logLevel])
     # set a format which is simpler for console use
-    formatter = logging.Formatter('%(name)-20s: %(levelname)-8s %(message)s')
-    # tell the handler to use this format
-    console.setFormatter(formatter)
-    # add the handler to the root logger
-    logging.getLogger('').addHandler(console)
+    console.setFormatter(logging.Formatter('%(name)-20s: %(levelname)-8s %(message)s'))
+    logQueue = queue.SimpleQueue()
+    rootLogger = logging.getLogger('')
+    rootLogger.setLevel(logLevel)
+    rootLogger.addHandler(logging.handlers.QueueHandler(logQueue))
+    listener = logging.handlers.QueueListener(logQueue, logFile, console)
+    listener.start()
     # ---------------------------------------------------------------------------
-    # event flag to exit
-    exitFlag = threading.Event()
-    # create a queue to receive comands
-    dataFIFO = queue.Queue()
-    # create a thread to parse responses
-    thread1 = threading.Thread(name="printData", target=printData,
-                               args=(dataFIFO, exitFlag))
-    thread1.start()
+    # open output once with a large buffer, writeData only flushes it
+    # every few samples
+    if args.binary:
+        if args.output is None:
+            out = sys.stdout.buffer
+        else:
+            out = open(args.output, 'wb', buffering=1 << 16)
+        callback, finish = writeRecords(out)
+    else:
+        if args.output is None:
+            out = sys.stdout
+        else:
+            out = open(args.output, 'w', buffering=1 << 16, newline='')
+        callback, finish = writeData(out)
+    # set once enough samples were received
+    done = threading.Event()
+    samples = 0
+
+    def countSample(newData):
+        nonlocal samples
+        callback(newData)
+        samples += 1
+        if samples == args.count:
+            done.set()
+
     # instanciate a class object
     gps = Gps(args.name)
-    # begin
-    if gps.begin(dataFIFO, comPort=args.port) != 1:
-        logging.info("Not able to begin device properly... check logfile")
-        exitFlag.set()
-        thread1.join()
-        return
+    try:
+        # begin, samples are written by the parser thread itself. At 10 Hz
+        # writing a line costs far less than reading it from the serial port,
+        # so no queue and printing thread are needed
+        if gps.begin(comPort=args.port, callback=countSample) != 1:
+            logging.info("Not able to begin device properly... check logfile")
+            return
 
-    # send unlogall
-    if gps.sendUnlogall() != 1:
-        logging.info("Unlogall command failed... check logfile")
-        gps.myPort.close()
-        return
-    # reconfigure port
-    gps.setCom(baud=115200)
-    # ask for bestxyz log
-    gps.askLog(trigger=2, period=0.1)
-    # wait 10 seconds
-    sleep(10)
-    # stop logs and shutdown gps
-    gps.shutdown()
-    # stop print thread
-    exitFlag.set()
-    thread1.join()
-    logging.shutdown()
-    # exit
-    logging.info('Exiting now')
+        # send unlogall
+        if gps.sendUnlogall() != 1:
+            logging.info("Unlogall command failed... check logfile")
+            # receiver does not answer, stop the parser thread without
+            # waiting for any response
+            gps.exitFlag.set()
+            gps.myPort.cancel_read()
+            gps.threadID.join()
+            gps.myPort.close()
+            gps.isOpen = False
+            return
+        # reconfigure port
+        gps.setCom(baud=115200)
+        # ask for bestxyz log
+        gps.askLog(trigger=2, period=0.1)
+        # wait for the samples asked, in case the receiver stops sending
+        # give up after 15 seconds
+        if not done.wait(timeout=15):
+            logging.warning("Only {0} of {1} samples received".format(samples, args.count))
+    finally:
+        # also reached on Ctrl+C or an error. Stop logs and shutdown gps,
+        # joining the parser thread, before out is touched here
+        if gps.isOpen:
+            gps.shutdown()
+        logging.info('Exiting now')
+        # parser thread is stopped, write what is still buffered
+        finish()
+        if out is not sys.stdout and out is not sys.stdout.buffer:
+            out.close()
+        # writes every record still queued before returning
+        listener.stop()
+        logging.shutdown()
     return
 
-
 if __name__ == '__main__':
     main()
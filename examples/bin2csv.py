@@ -0,0 +1,97 @@
+""" Convert binary BESTXYZ records saved by simple_test.py into csv
+
+Records are written by ``simple_test.py --binary`` (or by the module test,
+``python NovatelOEM4.py --binary``) with the ``RECORD`` struct below and
+converted here, offline, to the same csv produced by ``simple_test.py``
+without ``--binary``.
+
+Example:
+
+.. code-block:: console
+
+    $python bin2csv.py output.bin -o output.csv
+
+For processing in numpy there is no need to convert, the file can be loaded
+as a structured array with a dtype matching ``RECORD``:
+
+.. code-block:: python
+
+    dtype = np.dtype([('Index', '<u4'), ('Time', '<u8'), ('pSolStatus', '<u4'),
+                      ('position', '<f8', 3), ('positionStd', '<f4', 3),
+                      ('velSolStatus', '<u4'), ('velocity', '<f8', 3),
+                      ('velocityStd', '<f4', 3), ('vLatency', '<f4'),
+                      ('solAge', '<f4'), ('numSolSatVs', 'u1')])
+    data = np.fromfile('output.bin', dtype)
+
+"""
+import mmap
+import os
+import struct
+import sys
+
+#: csv header line.
+CSV_HEADER = ('Index,Time,PSolStatus,X,Y,Z,stdX,stdY,stdZ,VSolStatus,'
+              'VX,VY,VZ,stdVX,stdVY,stdVZ,VLatency,SolAge,SolSatNumber\n')
+#: csv line of a single record, same field order as RECORD. Fixed precision
+#: keeps lines short and avoids the slower shortest repr of floats.
+CSV_ROW = ('%5d,%d,%s,%.6f,%.6f,%.6f,%.4f,%.4f,%.4f,%s,%.6f,%.6f,%.6f,'
+           '%.4f,%.4f,%.4f,%.4f,%.3f,%d\n')
+#: binary record: Index, Time, pSolStatus, position, positionStd,
+#: velSolStatus, velocity, velocityStd, vLatency, solAge and numSolSatVs.
+RECORD = struct.Struct('<IQI3d3fI3d3fffB')
+
+
+def packRecord(newData):
+    """Pack a BestXYZ sample into a RECORD."""
+    px, py, pz = newData.position
+    sx, sy, sz = newData.positionStd
+    vx, vy, vz = newData.velocity
+    svx, svy, svz = newData.velocityStd
+    return RECORD.pack(newData.Index, newData.Time,
+                       newData.pSolStatus, px, py, pz, sx, sy, sz,
+                       newData.velSolStatus, vx, vy, vz, svx, svy, svz,
+                       newData.vLatency, newData.solAge, newData.numSolSatVs)
+
+
+def convert(inFP, outFP):
+    """Write all records of binary file inFP as csv lines into outFP.
+
+    Returns:
+        number of records converted.
+    """
+    outFP.write(CSV_HEADER)
+    size = os.fstat(inFP.fileno()).st_size
+    # ignore a truncated last record, e.g. after a power loss
+    size -= size % RECORD.size
+    if size == 0:
+        return 0
+    count = 0
+    with mmap.mmap(inFP.fileno(), size, access=mmap.ACCESS_READ) as mm:
+        for record in RECORD.iter_unpack(mm):
+            outFP.write(CSV_ROW % record)
+            count += 1
+    return count
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(add_help=True,
+                                     description='Convert binary BESTXYZ records to csv')
+    parser.add_argument('input', action='store', type=str,
+                        help='binary file saved by simple_test.py --binary')
+    parser.add_argument('-o', '--output', action='store', type=str, dest='output',
+                        default=None, help='csv file to write (default stdout)')
+    args = parser.parse_args()
+
+    with open(args.input, 'rb') as inFP:
+        if args.output is None:
+            convert(inFP, sys.stdout)
+        else:
+            with open(args.output, 'w', newline='') as outFP:
+                convert(inFP, outFP)
+    return
+
+
+if __name__ == '__main__':
+    main()
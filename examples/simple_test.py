@@ -1,59 +1,98 @@
+import os
 import signal
 import threading
 import logging
-from time import sleep
+from time import monotonic
 import sys
-# make it compatible with python 2.7
-try:
-    import queue
-except ImportError:
-    import Queue as queue
+import queue
 
 sys.path.append('..')
 import NovatelOEM4 as Novatel
+from bin2csv import CSV_HEADER, CSV_ROW, packRecord
 
 
 def main():
     import argparse
 
-    def signal_handler(signal, frame):
+    def signal_handler(sig, frame):
+        # only flag the request, cleanup is done by main thread
         print('You pressed Ctrl+C!')
-        gps.shutdown()
+        exitFlag.set()
         return
 
-    def saveData(dataQueue, fileFP, exitFlag):
-
-        fileFP.write("Index,Time,PSolStatus,X,Y,Z,stdX,stdY,stdZ,VSolStatus,VX,VY,VZ,stdVX,stdVY,stdVZ,VLatency,SolAge,SolSatNumber\n")
-        fileFP.flush()
-        while(exitFlag.isSet() == False):
-            if(dataQueue.empty() == False):
-                newData = dataQueue.get()
-                fileFP.write('{0:5d},{1},{2},{3},{4},{5},'
-                             '{6},{7},{8},{9},{10},{11},'
-                             '{12},{13},{14},{15},{16},'
-                             '{17},{18}\n'.format(newData['Indice'],
-                                                  newData['Time'],
-                                                  newData['pSolStatus'],
-                                                  newData['position'][0],
-                                                  newData['position'][1],
-                                                  newData['position'][2],
-                                                  newData['positionStd'][0],
-                                                  newData['positionStd'][1],
-                                                  newData['positionStd'][2],
-                                                  newData['velSolStatus'],
-                                                  newData['velocity'][0],
-                                                  newData['velocity'][1],
-                                                  newData['velocity'][2],
-                                                  newData['velocityStd'][0],
-                                                  newData['velocityStd'][1],
-                                                  newData['velocityStd'][2],
-                                                  newData['vLatency'],
-                                                  newData['solAge'],
-                                                  newData['numSolSatVs']
-                                                  ))
-                fileFP.flush()
+    def raisePriority(thread, priority=10):
+        """ Run thread with real time round robin scheduling
+
+        Only available on Linux and needs enough privileges (root or
+        CAP_SYS_NICE). On failure thread keeps its default priority.
+
+        Args:
+            thread: a started threading.Thread object.
+            priority: SCHED_RR priority to be used.
+
+        Returns:
+            True or False if the priority was changed or not.
+        """
+        try:
+            os.sched_setscheduler(thread.native_id, os.SCHED_RR,
+                                  os.sched_param(priority))
+        except (AttributeError, OSError) as e:
+            logging.info("Not able to raise priority of {0}: {1}".format(thread.name, e))
+            return False
+        return True
+
+    def dataRow(newData):
+        px, py, pz = newData.position
+        sx, sy, sz = newData.positionStd
+        vx, vy, vz = newData.velocity
+        svx, svy, svz = newData.velocityStd
+        return CSV_ROW % (newData.Index, newData.Time, newData.pSolStatus,
+                          px, py, pz, sx, sy, sz,
+                          newData.velSolStatus, vx, vy, vz, svx, svy, svz,
+                          newData.vLatency, newData.solAge,
+                          newData.numSolSatVs)
+
+    def saveData(dataQueue, fileFP, formatRow, header=None):
+
+        # bind the names used on every batch once
+        getAll = dataQueue.getAll
+        writelines = fileFP.writelines
+        flush = fileFP.flush
+        Empty = queue.Empty
+
+        if header is not None:
+            # no flush here, it goes out with the first periodic flush
+            fileFP.write(header)
+        lastFlush = monotonic()
+        pending = header is not None  # rows written but not flushed yet
+        while True:
+            # park for as long as needed: forever if everything is on disk,
+            # otherwise only until the next flush is due
+            if pending:
+                timeout = max(lastFlush + 1.0 - monotonic(), 0)
+            else:
+                timeout = None
+            try:
+                # everything that arrived since last time, written in one go
+                batch = getAll(timeout=timeout)
+            except Empty:
+                # stream went idle, push out what is still buffered
+                flush()
+                lastFlush = monotonic()
+                pending = False
+                continue
+            if not batch:
+                # queue closed on shutdown
+                break
+            writelines(map(formatRow, batch))
+            # rely on the file buffer and only flush about once per second
+            now = monotonic()
+            if now - lastFlush > 1.0:
+                flush()
+                lastFlush = now
+                pending = False
             else:
-                sleep(0.1)
+                pending = True
         return
 
     # -------------------------------------------------------------------------
@@ -63,9 +102,16 @@ def main():
     parser = argparse.ArgumentParser(add_help=True,
                                      description='Simple tester for Novatel library')
     parser.add_argument('-f', '--file', action='store', type=str, dest="filename",
-                        default='./output.csv', help='file to save data')
-    parser.add_argument('--log', action='store', type=str, dest='log', default='output.log',
-                        help='log file to be used')
+                        default=None,
+                        help='file to save data (default ./output.csv, or '
+                             './output.bin with --binary)')
+    parser.add_argument('--binary', action='store_true', dest='binary',
+                        help='save fixed size binary records instead of csv. '
+                             'Use bin2csv.py to convert them afterwards')
+    parser.add_argument('--no-save', action='store_false', dest='save',
+                        help='do not save received data, only drive the receiver')
+    parser.add_argument('--log', action='store', type=str, dest='log', default=None,
+                        help='log file to be used (default no logging)')
 
     parser.add_argument("--log-level", action="store", type=str,
                         dest="logLevel", default='info',
@@ -81,50 +127,76 @@ def main():
                 'critical': logging.CRITICAL
                 }
 
-    logging.basicConfig(filename=args.log,
-                        level=log_Level[args.logLevel],
-                        format='[%(asctime)s] [%(threadName)-10s] %(levelname)-8s %(message)s',
-                        filemode="w")
-    # ---------------------------------------------------------------------------
-    # define a Handler which writes INFO messages or higher in console
-    # ---------------------------------------------------------------------------
-    console = logging.StreamHandler()
-    console.setLevel(log_Level[args.logLevel])
-    # set a format which is simpler for console use
-    formatter = logging.Formatter('%(name)-20s: %(levelname)-8s %(message)s')
-    # tell the handler to use this format
-    console.setFormatter(formatter)
-    # add the handler to the root logger
-    logging.getLogger('').addHandler(console)
-    # ---------------------------------------------------------------------------
-
-    dataFile = args.filename
-    # create a queue for data input
-    dataQueue = queue.Queue()
-    # open file for saving data input
-    myFile = open(dataFile, 'w')
+    if args.log is not None:
+        logging.basicConfig(filename=args.log,
+                            level=log_Level[args.logLevel],
+                            format='[%(asctime)s] [%(threadName)-10s] %(levelname)-8s %(message)s',
+                            filemode="w")
+        # -----------------------------------------------------------------------
+        # define a Handler which writes INFO messages or higher in console
+        # -----------------------------------------------------------------------
+        console = logging.StreamHandler()
+        console.setLevel(log_Level[args.logLevel])
+        # set a format which is simpler for console use
+        formatter = logging.Formatter('%(name)-20s: %(levelname)-8s %(message)s')
+        # tell the handler to use this format
+        console.setFormatter(formatter)
+        # add the handler to the root logger
+        logging.getLogger('').addHandler(console)
+
     # create a flag to signal we want to exit program
     exitFlag = threading.Event()
-    # now define the thread
-    threadID = threading.Thread(name="saveData", target=saveData,
-                                args=(dataQueue, myFile, exitFlag))
-    threadID.start()
-    # prepare signal and handlers
-    signal.signal(signal.SIGINT, signal_handler)
+    dataQueue = None
+    if args.save:
+        dataFile = args.filename
+        if dataFile is None:
+            dataFile = './output.bin' if args.binary else './output.csv'
+        # create a bounded queue for data input, so memory stays flat if
+        # saveData falls behind
+        dataQueue = Novatel.RingQueue(maxsize=4096)
+        # open file for saving data input. Use a large buffer, writes only
+        # reach the disk on the periodic flush. newline='' keeps '\n' line
+        # endings untranslated on every platform.
+        if args.binary:
+            myFile = open(dataFile, 'wb', buffering=1 << 20)
+            saveArgs = (dataQueue, myFile, packRecord)
+        else:
+            myFile = open(dataFile, 'w', buffering=1 << 20, newline='')
+            saveArgs = (dataQueue, myFile, dataRow, CSV_HEADER)
+        # now define the thread, as daemon so it never keeps the process alive
+        threadID = threading.Thread(name="saveData", target=saveData,
+                                    args=saveArgs, daemon=True)
+        threadID.start()
+        raisePriority(threadID)
     gps = Novatel.Gps()
-    if gps.begin(dataQueue) != 1:
-        print("Not able to begin device properly... check logfile")
-        return
-    gps.setCom(baud=115200)
-    # 0 Air 1 Land 2 foot
-    # gps.setDynamics(2)
-    gps.askLog(trigger=2, period=0.05)
-    print('Press Ctrl+C to Exit')
-    signal.pause()
-    exitFlag.set()
-    threadID.join()
-    myFile.flush()
-    myFile.close()
+    try:
+        # prepare signal and handlers
+        signal.signal(signal.SIGINT, signal_handler)
+        if gps.begin(dataQueue) != 1:
+            print("Not able to begin device properly... check logfile")
+            return
+        # serial reader thread feeds saveData, elevate it too
+        if args.save:
+            raisePriority(gps.threadID)
+        gps.setCom(baud=115200)
+        # 0 Air 1 Land 2 foot
+        # gps.setDynamics(2)
+        gps.askLog(trigger=2, period=0.05)
+        print('Press Ctrl+C to Exit')
+        exitFlag.wait()
+    finally:
+        # a second Ctrl+C raises KeyboardInterrupt, e.g. if shutdown hangs
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        # also reached on errors. The parser thread is not a daemon and
+        # feeds dataQueue, stop it before closing the queue and the file
+        if gps.isOpen:
+            gps.shutdown()
+        if args.save:
+            # saveData writes everything already queued and exits
+            dataQueue.close()
+            threadID.join(timeout=2)
+            # close also flushes what is left in the buffer
+            myFile.close()
     logging.shutdown()
     print('Exiting now')
     return